@@ -1,7 +1,16 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import io
+import hashlib
+
+from kernels import cell_sums
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; without it groupby uses the default engine
+    njit = None
 
 st.set_page_config(
     page_title="Universal EDA Explorer",
@@ -9,19 +18,184 @@ st.set_page_config(
     initial_sidebar_state="expanded"  # This makes the sidebar shown by default
 )
 
-# Performance: cache file reading
+# Performance: cache file reading by content hash; the raw bytes are excluded from hashing
 @st.cache_data
-def load_csv(file):
+def load_csv(file_key, _raw_bytes):
     try:
-        return pd.read_csv(file)
+        try:
+            # Performance: multithreaded Arrow parser, falling back to the default engine
+            df = pd.read_csv(io.BytesIO(_raw_bytes), engine="pyarrow")
+        except Exception:
+            df = pd.read_csv(io.BytesIO(_raw_bytes))
     except Exception as e:
         st.error(f"Error loading CSV: {e}")
         return None
+    # Performance: store repetitive text columns as categoricals
+    for col in df.select_dtypes(include="object").columns:
+        if df[col].nunique() * 2 < len(df):
+            df[col] = df[col].astype("category")
+    return df
+
+# Performance: compute sidebar filter options once per dataset
+@st.cache_data
+def get_filter_options(df):
+    nunq = df.nunique(dropna=True)
+    candidate_cols = nunq[(nunq > 1) & (nunq < 100)].index  # Only filter if not too many unique values and not constant
+    options = {}
+    for col in candidate_cols:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Categories are already unique and sorted from the load-time conversion
+            options[col] = df[col].cat.categories.tolist()
+            continue
+        vals = pd.unique(df[col].dropna().values)
+        options[col] = np.sort(vals)
+    return nunq, options
+
+# Derived column metadata for the graph and filter controls
+def compute_schema(df):
+    columns = df.columns.tolist()
+    is_num = {col: pd.api.types.is_numeric_dtype(dtype) for col, dtype in df.dtypes.items()}
+    nunq, filter_options = get_filter_options(df)
+    numeric_columns = df.select_dtypes(include=["number", "bool"]).columns.tolist()
+    numeric_set = set(numeric_columns)
+    categorical_columns = [col for col in columns if col not in numeric_set and nunq[col] < 100]  # Reuses the filter pre-pass
+    return columns, numeric_columns, categorical_columns, nunq, filter_options, is_num
+
+# Performance: only re-filter when the file or filter selections change. The frame is
+# keyed by file_key rather than hashed, and cache_resource hands back the cached result
+# without copying it, so callers must treat filtered frames as read-only. The cache is
+# shared by all sessions, so it is bounded to a few recent frames that expire after an hour
+@st.cache_resource(max_entries=8, ttl=3600)
+def apply_filters(file_key, _df, filter_items, _is_num):
+    # Fill one row per filter, then reduce them into a single mask and index the frame once
+    masks = np.empty((len(filter_items), len(_df)), dtype=bool)
+    for i, (col, selected) in enumerate(filter_items):
+        if isinstance(_df[col].dtype, pd.CategoricalDtype):
+            # Compare integer category codes instead of string objects. Options are shown as
+            # str(category), so match on that text to also handle e.g. Arrow-parsed dates
+            matches = np.flatnonzero(_df[col].cat.categories.astype(str) == selected)
+            code = matches[0] if len(matches) else -2  # -2 matches no rows (missing values are coded -1)
+            masks[i] = _df[col].cat.codes.values == code
+            continue
+        try:
+            dtype = _df[col].dtype
+            if _is_num[col]:
+                selected = pd.to_numeric(selected)
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
+                selected = pd.Timestamp(selected).to_datetime64()
+        except Exception:
+            pass
+        if pd.api.types.is_object_dtype(dtype):
+            # Non-string objects such as datetime.date; such columns were too varied for the
+            # category conversion, so they are short enough to compare as text
+            masks[i] = _df[col].astype(str).values == selected
+            continue
+        masks[i] = _df[col].values == selected
+    mask = np.logical_and.reduce(masks, axis=0)
+    return _df.iloc[mask], mask
+
+# Performance: take the first rows that pass the filters straight from the mask
+def preview_head(df, mask, n=20):
+    if mask is None:
+        return df.head(n)
+    idx = np.flatnonzero(mask)[:n]
+    return df.iloc[idx]
+
+# Performance: build the count heatmap from factorized codes instead of pivot_table
+def count_matrix(df, x, y):
+    xc, xu = pd.factorize(df[x], sort=True)
+    yc, yu = pd.factorize(df[y], sort=True)
+    valid = (xc >= 0) & (yc >= 0)  # Drop missing values, as pivot_table does
+    flat = xc[valid] * len(yu) + yc[valid]
+    counts = np.bincount(flat, minlength=len(xu) * len(yu)).reshape(len(xu), len(yu))
+    return pd.DataFrame(counts, index=pd.Index(xu, name=x), columns=pd.Index(yu, name=y))
+
+def agg_matrix(df, x, y, values, agg_func):
+    if not pd.api.types.is_numeric_dtype(df[values]):
+        return pd.pivot_table(df, index=x, columns=y, values=values, aggfunc=agg_func, fill_value=0)
+    xc, xu = pd.factorize(df[x], sort=True)
+    yc, yu = pd.factorize(df[y], sort=True)
+    v = df[values].to_numpy(dtype=np.float64, na_value=np.nan)
+    out, cnt = cell_sums(xc, yc, v, len(xu), len(yu))
+    if agg_func == "mean":
+        out = np.divide(out, cnt, out=np.zeros_like(out), where=cnt > 0)
+    return pd.DataFrame(out, index=pd.Index(xu, name=x), columns=pd.Index(yu, name=y))
+
+# Performance: cache numeric summaries
+@st.cache_data
+def describe_column(series):
+    return series.describe()
+
+# Performance: build each figure once per data/column selection; height and axis
+# titles are applied afterwards so tweaking them does not rebuild the traces
+@st.cache_data
+def build_figure(_plot_df, _scatter_df, data_key, relationship_type, selected_x, selected_y,
+                 x_is_num, y_is_num, color_by, agg_func, render_mode):
+    fig = None
+    # Group once for the aggregated bar branches, skipping unobserved categories; the k-row
+    # results are sorted afterwards so bars keep the sorted order of a default groupby
+    gb = None
+    if agg_func != "count" and relationship_type in ["Auto", "One-to-Many"]:
+        gb = _plot_df.groupby(selected_x, sort=False, observed=True)
+    # Performance: JIT-compiled, parallel group reductions for large frames when numba is installed
+    # (the numba executor only handles int/float values, so bool columns keep the Cython path)
+    agg_kwargs = {}
+    if njit is not None and len(_plot_df) > 100_000 and _plot_df[selected_y].dtype.kind in "iuf":
+        agg_kwargs = {"engine": "numba", "engine_kwargs": {"parallel": True}}
+    if relationship_type == "Auto":
+        if x_is_num and y_is_num:
+            fig = px.scatter(_scatter_df, x=selected_x, y=selected_y,
+                             color=None if color_by == "None" else color_by,
+                             title=f"{selected_y} vs {selected_x} (Scatter)",
+                             render_mode=render_mode)
+        elif y_is_num:
+            if agg_func == "count":
+                fig = px.bar(_plot_df, x=selected_x, color=None if color_by == "None" else color_by,
+                             title=f"{selected_y} by {selected_x} (Bar)")
+            else:
+                grouped = getattr(gb[selected_y], agg_func)(**agg_kwargs).sort_index().reset_index()
+                fig = px.bar(grouped, x=selected_x, y=selected_y,
+                             color=None if color_by == "None" else color_by,
+                             title=f"{selected_y} by {selected_x} ({agg_func.title()})")
+        else:
+            fig = px.histogram(_plot_df, x=selected_x, color=None if color_by == "None" else color_by,
+                               title=f"Distribution of {selected_x} (Histogram)")
+    elif relationship_type == "One-to-One":
+        fig = px.scatter(_scatter_df, x=selected_x, y=selected_y,
+                         color=None if color_by == "None" else color_by,
+                         title=f"One-to-One: {selected_y} vs {selected_x}",
+                         render_mode=render_mode)
+    elif relationship_type == "One-to-Many":
+        if agg_func == "count":
+            fig = px.bar(_plot_df, x=selected_x, color=None if color_by == "None" else color_by,
+                         title=f"One-to-Many: {selected_y} by {selected_x} (Count)")
+        else:
+            grouped = getattr(gb[selected_y], agg_func)(**agg_kwargs).sort_index().reset_index()
+            fig = px.bar(grouped, x=selected_x, y=selected_y,
+                         color=None if color_by == "None" else color_by,
+                         title=f"One-to-Many: {selected_y} by {selected_x} ({agg_func.title()})")
+    elif relationship_type == "Many-to-Many":
+        if not (x_is_num or y_is_num):
+            if agg_func == "count":
+                pivot = count_matrix(_plot_df, selected_x, selected_y)
+            else:
+                pivot = agg_matrix(_plot_df, selected_x, selected_y, _plot_df.columns[0], agg_func)
+            fig = px.imshow(pivot, title=f"Many-to-Many: {selected_x} vs {selected_y} (Heatmap)",
+                            labels={"x": selected_x, "y": selected_y})
+    return fig
+
+# Performance: only regenerate the standalone plot HTML when the figure changes
+@st.cache_data
+def fig_to_html(fig_json):
+    import plotly.io as pio
+    return pio.from_json(fig_json).to_html()
 
 # File uploader for custom dataset
 uploaded_file = st.file_uploader("Upload your CSV dataset", type=["csv"])
 if uploaded_file is not None:
-    df = load_csv(uploaded_file)
+    raw_bytes = uploaded_file.getvalue()
+    file_key = hashlib.md5(raw_bytes).hexdigest()
+    df = load_csv(file_key, raw_bytes)
     if df is not None:
         st.success("Custom dataset loaded!")
     else:
@@ -32,41 +206,48 @@ else:
 
 st.title("🔎 Universal EDA Explorer")
 
-columns = df.columns.tolist()
+# Performance: keep the derived schema in session state until a different file is uploaded
+if st.session_state.get("_schema_key") != file_key:
+    st.session_state["_schema"] = compute_schema(df)
+    st.session_state["_schema_key"] = file_key
+columns, numeric_columns, categorical_columns, nunq, filter_options, is_num = st.session_state["_schema"]
 
 # Dynamically build sidebar filters based on available columns
 st.sidebar.header("Filter Data")
 filter_values = {}
-for col in columns:
-    unique_vals = sorted(df[col].dropna().unique())
-    if 1 < len(unique_vals) < 100:  # Only show filter if not too many unique values and not constant
-        selected = st.sidebar.selectbox(f"{col}", options=["All"] + [str(v) for v in unique_vals])
-        filter_values[col] = selected
+for col, unique_vals in filter_options.items():
+    selected = st.sidebar.selectbox(f"{col}", options=["All"] + [str(v) for v in unique_vals])
+    filter_values[col] = selected
 
 # Filter DataFrame based on sidebar selections
-filtered_df = df.copy()
-for col, selected in filter_values.items():
-    if selected != "All":
-        try:
-            dtype = df[col].dtype
-            if pd.api.types.is_numeric_dtype(dtype):
-                selected = pd.to_numeric(selected)
-        except Exception:
-            pass
-        filtered_df = filtered_df[filtered_df[col] == selected]
+filter_items = tuple(sorted((col, selected) for col, selected in filter_values.items() if selected != "All"))
+if filter_items:
+    filtered_df, filter_mask = apply_filters(file_key, df, filter_items, is_num)
+else:
+    filtered_df, filter_mask = df, None
 
 # Handle empty DataFrame
 if filtered_df.empty:
     st.warning("No data available for the selected filters. Please adjust your filters.")
     st.stop()
 
+# Performance: render large scatter plots with WebGL instead of SVG
+render_mode = "webgl" if len(filtered_df) > 1000 else "svg"
+
+# Performance: down-sample very large frames before building scatter plots
+MAX_SCATTER_POINTS = 50_000
+if len(filtered_df) > MAX_SCATTER_POINTS:
+    scatter_df = filtered_df.iloc[::-(-len(filtered_df) // MAX_SCATTER_POINTS)]
+else:
+    scatter_df = filtered_df
+
 # Add help/documentation
 with st.expander("ℹ️ How to use this dashboard", expanded=False):
     st.markdown("""
     - **Filter** the data using the sidebar.
     - **Select X and Y columns** to visualize relationships.
     - **Choose a relationship type** for different graph styles.
-    - **Summary statistics** for any column are shown on the right.
+    - **Summary statistics** for any column are shown after ticking *Compute summary* on the right.
     - If no graph appears, check your selections or filters.
     """)
 
@@ -78,10 +259,6 @@ relationship_type = st.radio(
     horizontal=True
 )
 
-# Column type filtering for graph selection
-numeric_columns = [col for col in columns if pd.api.types.is_numeric_dtype(df[col])]
-categorical_columns = [col for col in columns if not pd.api.types.is_numeric_dtype(df[col]) and df[col].nunique() < 100]
-
 col1, col2, col3 = st.columns(3)
 with col1:
     if relationship_type == "Many-to-Many":
@@ -101,32 +278,34 @@ with col2:
     selected_y = st.selectbox("Y Column", options=y_options)
 with col3:
     selected_col = st.selectbox("Summary Column", options=columns)
+    show_summary = st.checkbox("Compute summary", value=False)
 
-# Show summary statistics
-if selected_col:
+# Show summary statistics (only computed on request)
+if selected_col and show_summary:
     st.markdown(f"#### Summary Statistics for `{selected_col}`")
-    if pd.api.types.is_numeric_dtype(df[selected_col]):
-        st.dataframe(filtered_df[selected_col].describe().to_frame())
+    if is_num[selected_col]:
+        st.dataframe(describe_column(filtered_df[selected_col]).to_frame())
     else:
-        st.dataframe(filtered_df[selected_col].value_counts().to_frame("count"))
+        counts = filtered_df[selected_col].value_counts()
+        st.dataframe(counts[counts > 0].to_frame("count"))  # Categoricals also list filtered-out levels
 
 # Input validation and user guidance
 if (selected_x == "Select..." or selected_y == "Select..."):
     st.info("Please select both X and Y columns to generate a graph.")
 else:
-    x_dtype = df[selected_x].dtype
-    y_dtype = df[selected_y].dtype
+    x_is_num = is_num[selected_x]
+    y_is_num = is_num[selected_y]
 
     # Warn if columns are not suitable for the selected relationship type
     warning = None
     if relationship_type in ["Auto", "One-to-One"]:
-        if not (pd.api.types.is_numeric_dtype(x_dtype) and pd.api.types.is_numeric_dtype(y_dtype)):
+        if not (x_is_num and y_is_num):
             warning = "Scatter plots work best with numeric columns for both X and Y."
     elif relationship_type == "One-to-Many":
-        if not pd.api.types.is_numeric_dtype(y_dtype):
+        if not y_is_num:
             warning = "Bar plots work best when Y is numeric."
     elif relationship_type == "Many-to-Many":
-        if pd.api.types.is_numeric_dtype(x_dtype) or pd.api.types.is_numeric_dtype(y_dtype):
+        if x_is_num or y_is_num:
             warning = "Heatmaps work best when both X and Y are categorical."
 
     if warning:
@@ -141,67 +320,21 @@ else:
         plot_height = st.slider("Plot Height (px)", min_value=300, max_value=1000, value=500)
 
     # Relationship-based graph selection
-    fig = None
-    if relationship_type == "Auto":
-        if pd.api.types.is_numeric_dtype(x_dtype) and pd.api.types.is_numeric_dtype(y_dtype):
-            fig = px.scatter(filtered_df, x=selected_x, y=selected_y,
-                             color=None if color_by == "None" else color_by,
-                             title=f"{selected_y} vs {selected_x} (Scatter)",
-                             height=plot_height,
-                             labels={selected_x: x_label, selected_y: y_label})
-        elif pd.api.types.is_numeric_dtype(y_dtype):
-            if agg_func == "count":
-                fig = px.bar(filtered_df, x=selected_x, color=None if color_by == "None" else color_by,
-                             title=f"{selected_y} by {selected_x} (Bar)",
-                             height=plot_height,
-                             labels={selected_x: x_label, selected_y: y_label})
-            else:
-                grouped = filtered_df.groupby(selected_x)[selected_y].agg(agg_func).reset_index()
-                fig = px.bar(grouped, x=selected_x, y=selected_y,
-                             color=None if color_by == "None" else color_by,
-                             title=f"{selected_y} by {selected_x} ({agg_func.title()})",
-                             height=plot_height,
-                             labels={selected_x: x_label, selected_y: y_label})
-        else:
-            fig = px.histogram(filtered_df, x=selected_x, color=None if color_by == "None" else color_by,
-                               title=f"Distribution of {selected_x} (Histogram)",
-                               height=plot_height,
-                               labels={selected_x: x_label})
-    elif relationship_type == "One-to-One":
-        fig = px.scatter(filtered_df, x=selected_x, y=selected_y,
-                         color=None if color_by == "None" else color_by,
-                         title=f"One-to-One: {selected_y} vs {selected_x}",
-                         height=plot_height,
-                         labels={selected_x: x_label, selected_y: y_label})
-    elif relationship_type == "One-to-Many":
-        if agg_func == "count":
-            fig = px.bar(filtered_df, x=selected_x, color=None if color_by == "None" else color_by,
-                         title=f"One-to-Many: {selected_y} by {selected_x} (Count)",
-                         height=plot_height,
-                         labels={selected_x: x_label, selected_y: y_label})
-        else:
-            grouped = filtered_df.groupby(selected_x)[selected_y].agg(agg_func).reset_index()
-            fig = px.bar(grouped, x=selected_x, y=selected_y,
-                         color=None if color_by == "None" else color_by,
-                         title=f"One-to-Many: {selected_y} by {selected_x} ({agg_func.title()})",
-                         height=plot_height,
-                         labels={selected_x: x_label, selected_y: y_label})
-    elif relationship_type == "Many-to-Many":
-        if not (pd.api.types.is_numeric_dtype(x_dtype) or pd.api.types.is_numeric_dtype(y_dtype)):
-            if agg_func == "count":
-                pivot = pd.pivot_table(filtered_df, index=selected_x, columns=selected_y, aggfunc='size', fill_value=0)
-            else:
-                pivot = pd.pivot_table(filtered_df, index=selected_x, columns=selected_y, values=filtered_df.columns[0], aggfunc=agg_func, fill_value=0)
-            fig = px.imshow(pivot, title=f"Many-to-Many: {selected_x} vs {selected_y} (Heatmap)",
-                            height=plot_height,
-                            labels={"x": x_label, "y": y_label})
-        else:
-            st.warning("Many-to-Many heatmap requires both X and Y to be categorical columns.")
+    fig = build_figure(filtered_df, scatter_df, (file_key, filter_items), relationship_type, selected_x, selected_y,
+                       x_is_num, y_is_num, color_by, agg_func, render_mode)
+    if fig is None and relationship_type == "Many-to-Many":
+        st.warning("Many-to-Many heatmap requires both X and Y to be categorical columns.")
 
     if fig is not None:
+        fig.update_layout(height=plot_height)
+        fig.update_xaxes(title_text=x_label)
+        if fig.layout.yaxis.title.text == selected_y:  # Count bars and histograms keep their "count" axis
+            fig.update_yaxes(title_text=y_label)
         st.plotly_chart(fig, use_container_width=True)
+        if scatter_df is not filtered_df and fig.data and fig.data[0].type in ["scatter", "scattergl"]:
+            st.caption(f"Showing {len(scatter_df):,} of {len(filtered_df):,} rows (evenly sampled) to keep the plot responsive.")
         # Download plot as HTML
-        plot_html = fig.to_html()
+        plot_html = fig_to_html(fig.to_json())
         st.download_button(
             label="⬇️ Download Plot as HTML",
             data=plot_html,
@@ -212,13 +345,11 @@ else:
 # --- Move Preview Data and Download Filtered Data as CSV to the end ---
 
 with st.expander("🔍 Preview Data"):
-    st.dataframe(filtered_df.head(20))
+    st.dataframe(preview_head(df, filter_mask))
 
-csv_buffer = io.StringIO()
-filtered_df.to_csv(csv_buffer, index=False)
 st.download_button(
     label="⬇️ Download Filtered Data as CSV",
-    data=csv_buffer.getvalue(),
+    data=filtered_df.to_csv(index=False).encode(),  # Skips the StringIO round-trip
     file_name="filtered_data.csv",
     mime="text/csv"
 )
\ No newline at end of file
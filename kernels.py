@@ -0,0 +1,27 @@
+# Numeric kernels live in their own module: Streamlit re-executes app.py on every
+# interaction, but imported modules persist, so jitted dispatchers compile only once
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to NumPy kernels
+    njit = None
+
+# Performance: fused single-pass sum/count over (x, y) cells for sum/mean heatmaps
+def _cell_sums(xc, yc, v, nx, ny):
+    out = np.zeros((nx, ny))
+    cnt = np.zeros((nx, ny))
+    for i in range(len(v)):
+        if xc[i] >= 0 and yc[i] >= 0 and not np.isnan(v[i]):
+            out[xc[i], yc[i]] += v[i]
+            cnt[xc[i], yc[i]] += 1
+    return out, cnt
+
+def _cell_sums_numpy(xc, yc, v, nx, ny):
+    valid = (xc >= 0) & (yc >= 0) & ~np.isnan(v)
+    flat = xc[valid] * ny + yc[valid]
+    out = np.bincount(flat, weights=v[valid], minlength=nx * ny).reshape(nx, ny)
+    cnt = np.bincount(flat, minlength=nx * ny).reshape(nx, ny)
+    return out, cnt
+
+cell_sums = njit(_cell_sums) if njit is not None else _cell_sums_numpy